@@ -23,14 +23,13 @@ setup(
     classifiers=[
         "License :: OSI Approved :: BSD License",
         "Programming Language :: Python :: 3",
-        "Programming Language :: Python :: 3.5",
-        "Programming Language :: Python :: 3.6",
-        "Programming Language :: Python :: 3.7",
+        "Programming Language :: Python :: 3.8",
         "Programming Language :: Python :: 3 :: Only",
         "Programming Language :: Python :: Implementation :: CPython",
         "Framework :: Matplotlib",
     ],
-    python_requires=">=3.6",
+    python_requires=">=3.8",
     install_requires=install_requires,
+    extras_require={"numba": ["numba"]},
     zip_safe=False,
 )
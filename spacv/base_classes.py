@@ -1,6 +1,5 @@
 from abc import ABCMeta, abstractmethod
 
-import geopandas as gpd
 import numpy as np
 from sklearn.model_selection import BaseCrossValidator
 
@@ -42,19 +41,20 @@ class BaseSpatialCV(BaseCrossValidator, metaclass=ABCMeta):
                     self.buffer_radius
                 )
             )
-        # num_samples = XYs.shape[0]
-        indices = XYs.index.values
+        num_samples = XYs.shape[0]
+        # Use the platform index type so sklearn can index without a cast
+        indices = XYs.index.values.astype(np.intp, copy=False)
+        train_mask = np.empty(num_samples, dtype=bool)
 
         for test_indices, train_excluded in self._iter_test_indices(XYs):
+            # Reuse one boolean mask over the samples rather than building
+            # set operations on the indices for every fold
+            train_mask.fill(True)
+            train_mask[test_indices] = False
             if train_excluded.ndim and train_excluded.size:
                 # Exclude the training indices within buffer
-                train_excluded = np.concatenate([test_indices, train_excluded])
-            else:
-                train_excluded = test_indices
-            train_index = np.setdiff1d(
-                np.union1d(indices, train_excluded),
-                np.intersect1d(indices, train_excluded),
-            )
+                train_mask[train_excluded] = False
+            train_index = indices[train_mask]
             if len(train_index) < 1:
                 raise ValueError(
                     "Training set is empty. Try lowering buffer_radius to include more training instances."
@@ -67,18 +67,18 @@ class BaseSpatialCV(BaseCrossValidator, metaclass=ABCMeta):
     ):
         # Remove training points from dead zone buffer
         if buffer_radius > 0:
-            # Buffer grid and clip training instances
-            candidate_deadzone = XYs.loc[~XYs.index.isin(test_indices)]
-            candidate_deadzone = convert_geodataframe(candidate_deadzone)
-            geometry_buffer = convert_geodataframe(geometry_buffer)
-            deadzone_points = gpd.sjoin(candidate_deadzone, geometry_buffer)
-            train_exclude = deadzone_points.loc[
-                ~deadzone_points.index.isin(test_indices)
-            ].index.values
+            # Query the spatial index of XYs, built once and reused across folds,
+            # for training instances intersecting the buffer
+            geometry_buffer = convert_geodataframe(geometry_buffer).geometry.values
+            _, deadzone_points = XYs.sindex.query(
+                geometry_buffer, predicate="intersects"
+            )
+            deadzone_points = np.unique(XYs.index.values[deadzone_points])
+            train_exclude = deadzone_points[~np.isin(deadzone_points, test_indices)]
             return test_indices, train_exclude
         else:
             # Yield empty array because no training data removed in dead zone when buffer is zero
-            _ = np.empty([], dtype=int)
+            _ = np.empty(0, dtype=np.intp)
             return test_indices, _
 
     @abstractmethod
@@ -2,7 +2,6 @@ import geopandas as gpd
 import numpy as np
 from matplotlib.collections import PolyCollection
 from shapely.geometry import Polygon
-from sklearn.neighbors import BallTree
 
 from .utils import convert_geodataframe, convert_numpy, geometry_to_2d
 
@@ -276,7 +275,8 @@ def assign_optimized_random(
 
 def assign_pt_to_grid(XYs, grid, distance_metric="euclidean", random_state=None):
     """
-    Spatial join pts to grids. Reassign border points to nearest grid based on centroid distance.
+    Spatial join pts to grids. Reassign border points to the nearest grid polygon,
+    measured in pseudo-mercator for geographic coordinates.
     """
     np.random.seed(random_state)
     XYs = convert_geodataframe(XYs)
@@ -286,25 +286,58 @@ def assign_pt_to_grid(XYs, grid, distance_metric="euclidean", random_state=None)
     XYs = gpd.sjoin(XYs, grid, how="left", predicate="within")[["geometry", "grid_id"]]
 
     # In rare cases, points will sit at the border separating two grids
-    if XYs["grid_id"].isna().any():
-        # Find border pts and assign to nearest grid centroid
-        # First project to pseudo-mercator if using 4326
-        epsg = grid.crs.to_epsg()
-        if epsg == 4326:
-            grid = grid.to_crs(3857)
-            grid_centroid = grid.geometry.centroid
-            grid = grid.to_crs(epsg)  # return to original EPSG
-        else:
-            grid_centroid = grid.geometry.centroid
-
-        grid_centroid = geometry_to_2d(grid_centroid)
-        border_pt_index = XYs["grid_id"].isna()
-        border_pts = XYs[border_pt_index].geometry
-        border_pts = geometry_to_2d(border_pts)
-
-        # Update border pt grid IDs
-        tree = BallTree(grid_centroid, metric=distance_metric)
-        grid_id = tree.query(border_pts, k=1, return_distance=False).flatten()
-        grid_id = grid.loc[grid_id, "grid_id"].values
-        XYs.loc[border_pt_index, "grid_id"] = grid_id
+    border_pt_index = XYs["grid_id"].isna()
+    if border_pt_index.any():
+        border_pts = XYs.loc[border_pt_index, ["geometry"]].reset_index(drop=True)
+        nearest_grid = grid[["geometry", "grid_id"]]
+
+        # Measure distances in pseudo-mercator for geographic coordinates,
+        # assuming WGS84 when haversine is requested without a CRS
+        if grid.crs is None and distance_metric == "haversine":
+            border_pts = border_pts.set_crs(4326)
+            nearest_grid = nearest_grid.set_crs(4326)
+        if nearest_grid.crs is not None and nearest_grid.crs.is_geographic:
+            border_pts = border_pts.to_crs(3857)
+            nearest_grid = nearest_grid.to_crs(3857)
+
+        # Update border pt grid IDs with the nearest grid, keeping the first
+        # grid where several are equidistant
+        nearest = gpd.sjoin_nearest(border_pts, nearest_grid)
+        nearest = nearest.sort_values("index_right", kind="stable")
+        nearest = nearest[~nearest.index.duplicated()].sort_index()
+        XYs.loc[border_pt_index, "grid_id"] = nearest["grid_id"].values
+    return XYs
+
+
+def _locate_tiles(coords, lower, upper, n_tiles):
+    """
+    Locate the tile holding each coordinate along one axis, comparing against
+    edges computed exactly as in construct_square_grid.
+    """
+    if upper <= lower:
+        return np.zeros(len(coords), dtype=np.intp)
+    step = (upper - lower) / n_tiles
+    edges = np.add(lower, np.multiply(np.arange(0, n_tiles + 1), step))
+    tiles = np.searchsorted(edges, coords, side="left") - 1
+    return np.clip(tiles, 0, n_tiles - 1).astype(np.intp)
+
+
+def assign_pt_to_square_grid(XYs, grid, tiles_x, tiles_y):
+    """
+    Assign pts to a square grid built over the same pts by construct_square_grid.
+    Tiles are located arithmetically from the same tile edges the grid is built
+    from instead of by spatial join, with border pts taking the tile to their
+    lower left.
+    """
+    XYs = convert_geodataframe(XYs)[["geometry"]].copy()
+    minx, miny, maxx, maxy = XYs.total_bounds
+    coords = geometry_to_2d(XYs.geometry)
+
+    # Tile position along each axis, where pts on a tile edge fall into the
+    # lower tile and pts on the outer edges are clipped into the grid
+    tile_ix = _locate_tiles(coords[:, 0], minx, maxx, tiles_x)
+    tile_iy = _locate_tiles(coords[:, 1], miny, maxy, tiles_y)
+
+    # Grid rows run West-East first, then South-North
+    XYs["grid_id"] = grid["grid_id"].values[tile_iy * tiles_x + tile_ix]
     return XYs
@@ -4,10 +4,15 @@ from typing import Optional, Union
 
 import geopandas as gpd
 import numpy as np
+from scipy.spatial import cKDTree
 from sklearn.cluster import MiniBatchKMeans
 
 from .base_classes import BaseSpatialCV
-from .grid_builder import assign_pt_to_grid, construct_blocks
+from .grid_builder import (
+    assign_pt_to_grid,
+    assign_pt_to_square_grid,
+    construct_blocks,
+)
 from .utils import geometry_to_2d, load_custom_polygon
 
 __all__ = ["HBLOCK", "SKCV", "RepeatedSKCV", "UserDefinedSCV"]
@@ -127,32 +132,52 @@ class HBLOCK(BaseSpatialCV):
             random_state=self.random_state,
         )
 
-        # Convert to GDF to use Geopandas functions
-        XYs = gpd.GeoDataFrame(({"geometry": XYs}))
-
-        # Assign pts to grids
-        XYs = assign_pt_to_grid(XYs, grid, self.distance_metric)
+        # Assign pts to grids, using the regular layout of square grids
+        # to skip the spatial join
+        if self.shape == "square":
+            XYs = assign_pt_to_square_grid(XYs, grid, self.tiles_x, self.tiles_y)
+            if not grid.crs == XYs.crs:
+                grid.crs = XYs.crs
+        else:
+            # Convert to GDF to use Geopandas functions
+            XYs = gpd.GeoDataFrame(({"geometry": XYs}))
+            XYs = assign_pt_to_grid(XYs, grid, self.distance_metric)
         grid_ids = np.unique(grid.grid_id)
 
+        # Buffer every grid at once and find the points within each buffer
+        if self.buffer_radius > 0:
+            grid_buffer = grid[["grid_id", "geometry"]].copy()
+            if XYs.crs is not None and XYs.crs.to_epsg() == 4326:
+                grid_buffer["geometry"] = (
+                    grid.geometry.to_crs(3857)
+                    .buffer(self.buffer_radius)
+                    .to_crs(grid.crs)
+                )
+            else:
+                grid_buffer["geometry"] = grid.buffer(self.buffer_radius)
+            deadzone = gpd.sjoin(XYs[["geometry"]], grid_buffer, predicate="intersects")
+            deadzone_by_grid = deadzone.groupby("grid_id").groups
+
+        # Positions of the points in each grid, found in a single pass
+        grid_positions = XYs.groupby("grid_id").indices
+        index_values = XYs.index.values
+
         # Yield test indices and optionally training indices within buffer
         for grid_id in grid_ids:
-            test_indices = XYs.loc[XYs["grid_id"] == grid_id].index.values
             # Remove empty grids
-            if len(test_indices) < 1:
+            if grid_id not in grid_positions:
                 continue
+            test_indices = index_values[grid_positions[grid_id]]
 
-            epsg = grid.crs.to_epsg()
-            if epsg == 4326:
-                grid = grid.to_crs(3857)
-                grid_poly_buffer = grid.loc[[grid_id]].buffer(self.buffer_radius)
-                grid_poly_buffer = grid_poly_buffer.to_crs(epsg)
-                grid = grid.to_crs(epsg)  # return to original EPSG
+            if self.buffer_radius > 0:
+                # Remove training points from dead zone buffer
+                deadzone_points = np.unique(deadzone_by_grid[grid_id])
+                train_exclude = np.setdiff1d(
+                    deadzone_points, test_indices, assume_unique=True
+                )
             else:
-                grid_poly_buffer = grid.loc[[grid_id]].buffer(self.buffer_radius)
-
-            test_indices, train_exclude = super()._remove_buffered_indices(
-                XYs, test_indices, self.buffer_radius, grid_poly_buffer
-            )
+                # Yield empty array because no training data removed in dead zone when buffer is zero
+                train_exclude = np.empty(0, dtype=np.intp)
             yield test_indices, train_exclude
 
 
@@ -219,6 +244,9 @@ class SKCV(BaseSpatialCV):
         )
 
         # If K = N, SLOO
+        if sloo and not lattice and self.buffer_radius > 0:
+            yield from self._iter_sloo_indices(XYs)
+            return
         if sloo:
             num_samples = XYs.shape[0]
             indices_from_folds = np.arange(num_samples)
@@ -258,6 +286,22 @@ class SKCV(BaseSpatialCV):
             )
             yield test_indices, train_exclude
 
+    def _iter_sloo_indices(self, XYs):
+        """
+        Generates spatial leave-one-out test indices for points, excluding
+        training points within buffer_radius of each test point. Neighbours
+        of all points are found with a single KD-tree radius query.
+        """
+        coords = geometry_to_2d(XYs)
+        neighbours = cKDTree(coords).query_ball_point(
+            coords, r=self.buffer_radius, return_sorted=True
+        )
+        index_values = XYs.index.values
+        for i, sloo_train_exclude in enumerate(neighbours):
+            sloo_train_exclude = np.asarray(sloo_train_exclude, dtype=np.intp)
+            sloo_train_exclude = sloo_train_exclude[sloo_train_exclude != i]
+            yield np.array([i]), index_values[sloo_train_exclude]
+
 
 class RepeatedSKCV(SKCV):
     """
@@ -357,12 +401,16 @@ class UserDefinedSCV(BaseSpatialCV):
 
         XYs = assign_pt_to_grid(XYs, grid, self.distance_metric)
 
+        # Positions of the points in each grid, found in a single pass
+        grid_positions = XYs.groupby("grid_id").indices
+        index_values = XYs.index.values
+
         # Yield test indices and optionally training indices within buffer
         for grid_id in grid_ids:
-            test_indices = XYs.loc[XYs["grid_id"] == grid_id].index.values
             # Remove empty grids
-            if len(test_indices) < 1:
+            if grid_id not in grid_positions:
                 continue
+            test_indices = index_values[grid_positions[grid_id]]
             grid_poly_buffer = grid.loc[[grid_id]].buffer(self.buffer_radius)
             test_indices, train_exclude = super()._remove_buffered_indices(
                 XYs, test_indices, self.buffer_radius, grid_poly_buffer
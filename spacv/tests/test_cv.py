@@ -133,6 +133,36 @@ class HBLOCK_Tester(unittest.TestCase):
         np.testing.assert_equal(self.fold_train_three, scv_train_three)
 
 
+class HBLOCKGeographic_Tester(unittest.TestCase):
+    def setUp(self):
+        np.random.seed(0)
+        x = np.random.uniform(-10, 10, 200)
+        y = np.random.uniform(40, 60, 200)
+
+        self.gdf = gpd.GeoDataFrame(
+            {"geometry": gpd.points_from_xy(x, y)}, crs="EPSG:4326"
+        )
+        self.buffer_radius = 15
+        self.train_sizes = [179, 173, 176, 178, 180, 182, 177, 175, 180]
+
+    def test_hblock_geographic_buffer(self):
+        scv = spacv.HBLOCK(3, 3, buffer_radius=self.buffer_radius)
+        projected = self.gdf.geometry.to_crs(3857)
+
+        train_sizes = []
+        for train, test in scv.split(self.gdf):
+            train_sizes.append(len(train))
+            self.assertEqual(len(np.intersect1d(train, test)), 0)
+
+            # Buffer is applied in metres, so no training pt may sit within
+            # buffer_radius of a pt in the test grid
+            for i in test:
+                distances = projected.iloc[train].distance(projected.iloc[i])
+                self.assertTrue((distances > self.buffer_radius).all())
+
+        self.assertEqual(train_sizes, self.train_sizes)
+
+
 class SKCVUnprojected_Tester(unittest.TestCase):
     def setUp(self):
         pass
@@ -143,10 +173,34 @@ class SKCVUnprojected_Tester(unittest.TestCase):
 
 class SLOO_Tester(unittest.TestCase):
     def setUp(self):
-        pass
+        # Point 1 sits exactly buffer_radius from point 0, point 2 just beyond it
+        x = np.array([0, 100, 0, 1000, 1050, 500])
+        y = np.array([0, 0, 150, 1000, 1000, 2000])
+
+        self.gdf = gpd.GeoDataFrame({"geometry": gpd.points_from_xy(x, y)})
+
+        self.fold_train = [
+            np.array([2, 3, 4, 5]),
+            np.array([2, 3, 4, 5]),
+            np.array([0, 1, 3, 4, 5]),
+            np.array([0, 1, 2, 5]),
+            np.array([0, 1, 2, 5]),
+            np.array([0, 1, 2, 3, 4]),
+        ]
 
     def test_sloo(self):
-        pass
+        scv = spacv.SKCV(n_splits=6, buffer_radius=100)
+
+        fold_train, fold_test = [], []
+        for train, test in scv.split(self.gdf):
+            fold_train.append(train)
+            fold_test.append(test)
+
+        self.assertEqual(len(fold_test), 6)
+        for i, (train, test) in enumerate(zip(fold_train, fold_test)):
+            np.testing.assert_equal(test, np.array([i]))
+            # Training pts removed in deadzone buffer check
+            np.testing.assert_equal(train, self.fold_train[i])
 
 
 class LatticeSKCV_Tester(unittest.TestCase):
@@ -174,7 +228,7 @@ class UserDefinedSCV_Tester(unittest.TestCase):
 
 
 suite = unittest.TestSuite()
-test_classes = [SKCV_Tester, HBLOCK_Tester]
+test_classes = [SKCV_Tester, HBLOCK_Tester, HBLOCKGeographic_Tester, SLOO_Tester]
 for i in test_classes:
     a = unittest.TestLoader().loadTestsFromTestCase(i)
     suite.addTest(a)
@@ -2,7 +2,11 @@ import unittest
 
 import geopandas as gpd
 import numpy as np
-from spacv.grid_builder import construct_blocks
+from spacv.grid_builder import (
+    assign_pt_to_grid,
+    assign_pt_to_square_grid,
+    construct_blocks,
+)
 
 
 class SquareUniqueGrid_Tester(unittest.TestCase):
@@ -118,11 +122,70 @@ class HexUniqueGrid_Tester(unittest.TestCase):
         np.random.seed(10)
 
 
+class SquareGridAssignment_Tester(unittest.TestCase):
+    def setUp(self):
+        np.random.seed(10)
+        self.tiles_x = 4
+        self.tiles_y = 3
+        # Integer lattice over [0, 12] puts pts on every interior tile edge,
+        # corner and outer bound of a 4 x 3 grid
+        x, y = np.meshgrid(np.arange(13), np.arange(13))
+        x = np.concatenate([x.ravel(), np.random.uniform(0, 12, 100)])
+        y = np.concatenate([y.ravel(), np.random.uniform(0, 12, 100)])
+        self.XYs = gpd.GeoSeries(gpd.points_from_xy(x, y))
+
+    def test_square_grid_assignment(self):
+        grid = construct_blocks(
+            self.XYs,
+            self.tiles_x,
+            self.tiles_y,
+            method="random",
+            n_groups=5,
+            random_state=123,
+        )
+        expected = assign_pt_to_grid(self.XYs, grid.copy())
+        assigned = assign_pt_to_square_grid(self.XYs, grid, self.tiles_x, self.tiles_y)
+
+        self.assertFalse(assigned["grid_id"].isna().any())
+        np.testing.assert_equal(
+            assigned["grid_id"].values, expected["grid_id"].values.astype(int)
+        )
+
+
+class SquareGridAssignmentEdges_Tester(unittest.TestCase):
+    def setUp(self):
+        np.random.seed(10)
+        self.tiles_x = 7
+        self.tiles_y = 3
+        # Non-integer bounds whose tile edges are not exactly representable,
+        # with pts placed on every edge as construct_square_grid computes them
+        minx, maxx, miny, maxy = 0.1, 1.3, -2.7, 0.35
+        dx = (maxx - minx) / self.tiles_x
+        dy = (maxy - miny) / self.tiles_y
+        edges_x = np.add(minx, np.multiply(np.arange(0, self.tiles_x + 1), dx))
+        edges_y = np.add(miny, np.multiply(np.arange(0, self.tiles_y + 1), dy))
+        x, y = np.meshgrid(edges_x, edges_y)
+        x = np.concatenate([x.ravel(), np.random.uniform(minx, maxx, 100)])
+        y = np.concatenate([y.ravel(), np.random.uniform(miny, maxy, 100)])
+        self.XYs = gpd.GeoSeries(gpd.points_from_xy(x, y))
+
+    def test_square_grid_assignment_edges(self):
+        grid = construct_blocks(self.XYs, self.tiles_x, self.tiles_y, method="unique")
+        expected = assign_pt_to_grid(self.XYs, grid.copy())
+        assigned = assign_pt_to_square_grid(self.XYs, grid, self.tiles_x, self.tiles_y)
+
+        np.testing.assert_equal(
+            assigned["grid_id"].values, expected["grid_id"].values.astype(int)
+        )
+
+
 suite = unittest.TestSuite()
 test_classes = [
     SquareUniqueGrid_Tester,
     SquareRandomGrid_Tester,
     SquareSystematicGrid_Tester,
+    SquareGridAssignment_Tester,
+    SquareGridAssignmentEdges_Tester,
 ]
 for i in test_classes:
     a = unittest.TestLoader().loadTestsFromTestCase(i)
@@ -1,3 +1,126 @@
+import unittest
+
 import matplotlib
 
 matplotlib.use("agg")  # To prevent plots from using display
+
+import numpy as np
+import pandas as pd
+from scipy.spatial.distance import cdist, squareform
+from sklearn.metrics.pairwise import haversine_distances
+from spacv import visualisation
+from spacv.visualisation import aoa, condensed_distances
+
+
+class CondensedDistances_Tester(unittest.TestCase):
+    def setUp(self):
+        np.random.seed(10)
+        lon = np.random.uniform(-10, 10, 50)
+        lat = np.random.uniform(40, 60, 50)
+        self.XYs = np.column_stack([lon, lat])
+
+    def test_haversine_distances(self):
+        # sklearn expects (lat, lon) in radians
+        expected = haversine_distances(np.radians(self.XYs[:, ::-1])) * 6371000
+        expected = squareform(expected, checks=False)
+        distances = condensed_distances(self.XYs, "haversine")
+        np.testing.assert_allclose(distances, expected, rtol=1e-9)
+
+    def test_unknown_metric(self):
+        with self.assertRaises(ValueError):
+            condensed_distances(self.XYs, "manhattan")
+
+
+def brute_force_aoa(new_data, training_data, fold_of, thres=0.95):
+    training_data = (training_data - np.mean(training_data)) / np.std(training_data)
+    new_data = (new_data - np.mean(new_data)) / np.std(new_data)
+    train_dist = cdist(training_data, training_data)
+    train_dist[fold_of[:, None] == fold_of[None, :]] = np.nan
+    train_dist_avgmean = np.mean(np.nanmean(train_dist, axis=1))
+    DIs = cdist(new_data, training_data).min(axis=1) / train_dist_avgmean
+    thres = np.quantile(np.nanmin(train_dist, axis=1) / train_dist_avgmean, q=thres)
+    return DIs, (DIs <= thres).astype(int)
+
+
+class AOA_Tester(unittest.TestCase):
+    def setUp(self):
+        np.random.seed(10)
+        columns = ["a", "b", "c"]
+        self.training_data = pd.DataFrame(
+            np.random.normal(size=(60, 3)), columns=columns
+        )
+        self.new_data = pd.DataFrame(np.random.normal(size=(40, 3)), columns=columns)
+
+    def assert_matches_brute_force(self, fold_indices, fold_of):
+        DIs, masked_result = aoa(
+            self.new_data, self.training_data, fold_indices=fold_indices
+        )
+        expected_DIs, expected_mask = brute_force_aoa(
+            self.new_data.values, self.training_data.values, fold_of
+        )
+        np.testing.assert_allclose(DIs, expected_DIs, rtol=1e-5)
+        np.testing.assert_equal(masked_result, expected_mask)
+
+    def test_aoa_no_folds(self):
+        self.assert_matches_brute_force(None, np.arange(60))
+
+    def test_aoa_folds(self):
+        fold_indices = list(np.random.permutation(60).reshape(3, 20))
+        fold_of = np.empty(60, dtype=int)
+        for fold_id, fold in enumerate(fold_indices):
+            fold_of[fold] = fold_id
+        self.assert_matches_brute_force(fold_indices, fold_of)
+
+    def test_aoa_partial_folds(self):
+        # Instances outside fold_indices only exclude themselves
+        fold_indices = [np.array([4, 5]), np.array([2, 3])]
+        fold_of = np.arange(60) + 2
+        fold_of[[4, 5]] = 0
+        fold_of[[2, 3]] = 1
+        self.assert_matches_brute_force(fold_indices, fold_of)
+
+    def test_aoa_single_fold(self):
+        with self.assertRaises(ValueError):
+            aoa(self.new_data, self.training_data, fold_indices=[np.arange(60)])
+
+
+class AOAStats_Tester(unittest.TestCase):
+    def setUp(self):
+        np.random.seed(10)
+        self.train = np.random.normal(size=(300, 4)).astype(np.float32)
+        self.fold_of = np.random.randint(0, 5, 300)
+
+        train_dist = cdist(self.train, self.train)
+        train_dist[self.fold_of[:, None] == self.fold_of[None, :]] = np.nan
+        self.expected_min = np.nanmin(train_dist, axis=1)
+        self.expected_sum = np.nansum(train_dist, axis=1)
+        self.expected_count = np.sum(~np.isnan(train_dist), axis=1)
+
+    def assert_matches_brute_force(self, row_min, row_sum, row_count):
+        np.testing.assert_allclose(row_min, self.expected_min, rtol=1e-5)
+        np.testing.assert_allclose(row_sum, self.expected_sum, rtol=1e-5)
+        np.testing.assert_equal(row_count, self.expected_count)
+
+    def test_blocked(self):
+        # Tiles that do not divide the number of instances
+        for tile in [64, 300, 1024]:
+            self.assert_matches_brute_force(
+                *visualisation._aoa_stats_blocked(self.train, self.fold_of, tile)
+            )
+
+    @unittest.skipIf(visualisation.njit is None, "numba is not installed")
+    def test_numba(self):
+        self.assert_matches_brute_force(
+            *visualisation._aoa_stats_numba(self.train, self.fold_of, 64)
+        )
+
+
+suite = unittest.TestSuite()
+test_classes = [CondensedDistances_Tester, AOA_Tester, AOAStats_Tester]
+for i in test_classes:
+    a = unittest.TestLoader().loadTestsFromTestCase(i)
+    suite.addTest(a)
+
+if __name__ == "__main__":
+    runner = unittest.TextTestRunner()
+    runner.run(suite)
@@ -5,6 +5,8 @@ from shapely.geometry import LineString, MultiPolygon, Point, Polygon
 
 
 def geometry_to_2d(geometry):
+    if isinstance(geometry, gpd.GeoSeries):
+        return np.column_stack([geometry.x.values, geometry.y.values])
     return np.array(list(map(lambda x: (x.x, x.y), geometry)))
 
 
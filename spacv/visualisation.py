@@ -1,16 +1,17 @@
 import logging
-import multiprocessing
+from multiprocessing import shared_memory
 from typing import Tuple, Union
 
 import geopandas as gpd
 import matplotlib.pyplot as plt
 import numpy as np
+from joblib import Parallel, delayed
 from matplotlib.axis import Axis
 from matplotlib.colors import ListedColormap
 from matplotlib.figure import Figure
 from scipy.optimize import curve_fit
-from scipy.spatial.distance import pdist, squareform
-from sklearn.metrics.pairwise import haversine_distances
+from scipy.spatial.distance import pdist
+from sklearn.metrics.pairwise import euclidean_distances
 from sklearn.neighbors import BallTree
 
 from .utils import geometry_to_2d
@@ -22,30 +23,80 @@ try:
 except ModuleNotFoundError:
     pass
 
+try:
+    from numba import njit, prange
+except ModuleNotFoundError:
+    njit = None
+
+# Training set size from which aoa uses the numba kernel when available
+AOA_NUMBA_MIN_SAMPLES = 5000
+
 __all__ = [
     "variogram_at_lag",
-    "compute_semivariance",
     "plot_autocorrelation_ranges",
     "aoa",
     "plot_aoa",
 ]
 
 
+def condensed_distances(XYs: np.ndarray, distance_metric: str = "euclidean"):
+    """
+    Return condensed pairwise distances between coordinates, in the same
+    order as scipy's pdist.
+
+    Parameters
+    ----------
+    XYs : array
+        Array (N, 2) of X and Y coordinates.
+    distance_metric : string
+        Distance function to calculate pairwise distances. Must be "euclidean" for
+        points in euclidean space, or "haversine" for points in a geographic CRS.
+        Defaults to "euclidean".
+
+    Returns
+    -------
+    paired_distances : array
+        Array (N * (N - 1) / 2,) of distances, in metres for haversine.
+    """
+    if distance_metric == "euclidean":
+        paired_distances = pdist(XYs)
+    elif distance_metric == "haversine":
+        # Great-circle distances from chord lengths on the unit sphere, which
+        # keeps the condensed form instead of a full N x N haversine matrix
+        lon, lat = np.radians(XYs).T
+        cos_lat = np.cos(lat)
+        unit_xyz = np.column_stack(
+            [cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)]
+        )
+        # Convert chords to angles in place to avoid condensed-size temporaries
+        paired_distances = pdist(unit_xyz)
+        paired_distances *= 0.5
+        np.clip(paired_distances, 0.0, 1.0, out=paired_distances)
+        np.arcsin(paired_distances, out=paired_distances)
+        paired_distances *= 2.0 * 6371000  # multiply by Earth radius to get meters
+    else:
+        raise ValueError(
+            "Distance metric not recognised. Choose between: euclidean or haversine."
+        )
+    return paired_distances
+
+
 def variogram_at_lag(
-    XYs: gpd.GeoSeries,
+    XYs: Union[gpd.GeoSeries, np.ndarray],
     x: Union[list, np.ndarray, gpd.GeoSeries],
     lags: np.ndarray,
     bw: Union[int, float],
     distance_metric: str = "euclidean",
     col_name: str = None,
+    precomputed_distances: np.ndarray = None,
 ) -> np.ndarray:
     """
     Return semivariance values for defined lag of distance.
 
     Parameters
     ----------
-    XYs : Geoseries series
-        Series containing X and Y coordinates.
+    XYs : Geoseries series or array
+        Series containing X and Y coordinates, or array (N, 2) of coordinates.
     X : array, list, or Geoseries
         Array (N,) containing variable.
     lags : array
@@ -56,80 +107,94 @@ def variogram_at_lag(
         Distance function to calculate pairwise distances. Must be "euclidean" for
         points in euclidean space, or "haversine" for points in a geographic CRS.
         Defaults to "euclidean".
+    col_name : string, default=None
+        Name of the variable, used when reporting lags without pairs.
+    precomputed_distances : array, default=None
+        Condensed pairwise distances between all points in XYs, as returned
+        by condensed_distances. When given, XYs is ignored and no distances
+        are computed. Points with missing values are skipped pair by pair
+        and no subsampling takes place.
 
     Returns
     -------
     semivariances : Array of floats
         Array of semivariances at defined lag points for given variable.
     """
-    XYs = geometry_to_2d(XYs)
     x = np.asarray(x)
 
-    # Remove nans from x and XYs for variogram calculation
-    nan_idx = np.isnan(x)
-    x = x[~nan_idx]
-    XYs = XYs[~nan_idx]
+    if precomputed_distances is None:
+        if not isinstance(XYs, np.ndarray):
+            XYs = geometry_to_2d(XYs)
 
-    # Select only 30000 random points from x and XYs to calculate pairwise distances
-    if len(x) > 30000:
-        idx = np.random.choice(len(x), 30000, replace=False)
-        x = x[idx]
-        XYs = XYs[idx]
+        # Remove nans from x and XYs for variogram calculation
+        nan_idx = np.isnan(x)
+        x = x[~nan_idx]
+        XYs = XYs[~nan_idx]
 
-    if distance_metric == "euclidean":
-        paired_distances = pdist(XYs)
-        pd_m = squareform(paired_distances)
-    elif distance_metric == "haversine":
-        pd_m = haversine_distances(np.radians([*XYs]))
-        pd_m = pd_m * 6371000  # multiply by Earth radius to get meters
+        # Select only 30000 random points from x and XYs to calculate pairwise distances
+        if len(x) > 30000:
+            idx = np.random.choice(len(x), 30000, replace=False)
+            x = x[idx]
+            XYs = XYs[idx]
 
-    semivariances = np.empty((len(lags)), dtype=np.float64)
+        paired_distances = condensed_distances(XYs, distance_metric)
+    else:
+        paired_distances = precomputed_distances
+
+    # Squared differences between each pair of observations, condensed like pdist.
+    # Pairs with identical or missing values never contribute, so drop them once up front
+    dx2 = pdist(x[:, None], "sqeuclidean")
+    nonzero = dx2 > 0.0
+    dx2 = dx2[nonzero]
+    paired_distances = paired_distances[nonzero]
+
+    # Batch all lags: sums and counts of pairs within the bandwidth are the
+    # differences between cumulative totals at the upper and lower bounds
+    lags = np.asarray(lags)
+    sum_upper, count_upper = _cumulative_at_bounds(
+        paired_distances, dx2, lags + bw, inclusive=True
+    )
+    sum_lower, count_lower = _cumulative_at_bounds(
+        paired_distances, dx2, lags - bw, inclusive=False
+    )
+    n_pairs = count_upper - count_lower
 
-    for i, lag in enumerate(lags):
-        # Mask pts outside bandwidth
-        lower = pd_m >= lag - bw
-        upper = pd_m <= lag + bw
-        mask = np.logical_and(lower, upper)
-        semivariances[i] = compute_semivariance(x, mask, bw, col_name)
+    semivariances = np.zeros((len(lags)), dtype=np.float64)
+    has_pairs = n_pairs > 0
+    semivariances[has_pairs] = (sum_upper - sum_lower)[has_pairs] / (
+        2.0 * n_pairs[has_pairs]
+    )
+    if not has_pairs.all():
+        logging.error(
+            f"Could not calculate semivariances for {col_name} at lags "
+            f"{lags[~has_pairs]}. Using 0 instead."
+        )
 
     return np.c_[semivariances, lags].T
 
 
-def compute_semivariance(x, mask, bw, col_name):
+def _cumulative_at_bounds(distances, values, bounds, inclusive):
     """
-    Calculate semivariance for masked elements.
+    Sum of values and number of pairs with distances below each bound, or at
+    it when inclusive. Each distance is binned once against the sorted bounds
+    rather than compared with every bound.
     """
-    semis, counts = [], []
-    for i in range(len(x)):
-        xi = np.array([x[i]])
-        mask_i = mask[i, :]
-        mask_i[:i] = False
-        xj = x[mask_i]
-        ss = (xi - xj) ** 2
-        filter_empty = ss > 0.0
-        if len(ss[filter_empty]) > 0:
-            counts.append(len(ss[filter_empty]))
-            semis.append(ss[filter_empty])
-    try:
-        semivariance = np.sum(np.concatenate(semis)) / (2.0 * sum(counts))
-        return semivariance
-    except ValueError:
-        logging.error(
-            f"Could not calculate semivariances for {col_name}. Using 0 instead."
-        )
-        return 0
+    bounds = np.asarray(bounds, dtype=np.float64)
+    order = np.argsort(bounds)
+    side = "left" if inclusive else "right"
+    bins = np.searchsorted(bounds[order], distances, side=side)
+    minlength = len(bounds) + 1
+    sums = np.cumsum(np.bincount(bins, weights=values, minlength=minlength))[:-1]
+    counts = np.cumsum(np.bincount(bins, minlength=minlength))[:-1]
+
+    # Return totals in the original order of the bounds
+    sums_at_bounds = np.empty(len(bounds), dtype=np.float64)
+    counts_at_bounds = np.empty(len(bounds), dtype=np.int64)
+    sums_at_bounds[order] = sums
+    counts_at_bounds[order] = counts
+    return sums_at_bounds, counts_at_bounds
 
 
-def variogram(func):
-    def send_params(*params):
-        new_args = params[1:]
-        mapping = map(lambda h: func(h, *new_args), params[0])
-        return np.fromiter(mapping, dtype=float)
-
-    return send_params
-
-
-@variogram
 def spherical(h, r, sill, nugget=0):
     """
     Spherical variogram model function. Calculates the
@@ -137,8 +202,8 @@ def spherical(h, r, sill, nugget=0):
 
     Parameters
     ----------
-    h : float
-        The lag at which the dependent variable is calculated at.
+    h : float or array
+        The lag(s) at which the dependent variable is calculated at.
     r : float
         Effective range of autocorrelation.
     sill : float
@@ -148,19 +213,21 @@ def spherical(h, r, sill, nugget=0):
         variable at the distance of zero.
     Returns
     -------
-    gamma : numpy float
+    gamma : numpy array
         Coefficients that describe effective range of spatial autocorrelation
     """
+    h = np.asarray(h, dtype=float)
     a = r / 1.0
-    if h <= r:
-        return nugget + sill * ((1.5 * (h / a)) - (0.5 * ((h / a) ** 3.0)))
-    else:
-        return nugget + sill
+    with np.errstate(divide="ignore", invalid="ignore"):
+        gamma = nugget + sill * ((1.5 * (h / a)) - (0.5 * ((h / a) ** 3.0)))
+    return np.where(h <= r, gamma, nugget + sill)
 
 
 def calculate_range(args):
-    XYs, col, lags, bw, distance_metric, col_name = args
-    semis = variogram_at_lag(XYs, col, lags, bw, distance_metric, col_name)
+    XYs, col, lags, bw, distance_metric, col_name, precomputed_distances = args
+    semis = variogram_at_lag(
+        XYs, col, lags, bw, distance_metric, col_name, precomputed_distances
+    )
     sv, h = semis[0], semis[1]
     start_params = [np.nanmax(h), np.nanmax(sv)]
     bounds = (0, start_params)
@@ -171,6 +238,22 @@ def calculate_range(args):
     return effective_range
 
 
+def calculate_range_shared(args):
+    """
+    Run calculate_range with precomputed distances read from shared memory,
+    given as a (name, shape, dtype) tuple in place of the distances array.
+    """
+    *range_args, (shm_name, shape, dtype) = args
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        precomputed_distances = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        effective_range = calculate_range((*range_args, precomputed_distances))
+        del precomputed_distances
+    finally:
+        shm.close()
+    return effective_range
+
+
 def plot_autocorrelation_ranges(
     XYs: gpd.GeoSeries,
     X: Union[np.ndarray, gpd.GeoDataFrame],
@@ -202,7 +285,8 @@ def plot_autocorrelation_ranges(
         points in euclidean space, or "haversine" for points in a geographic CRS.
         Defaults to "euclidean".
     workers : int
-        Use multiprocessing for >1 worker. -1 uses all available cores. Defaults to 1.
+        Use parallel worker processes for >1 worker. -1 uses all available cores.
+        Defaults to 1.
     verbose : bool
         Print name of current column being processed.
 
@@ -221,30 +305,78 @@ def plot_autocorrelation_ranges(
 
     ranges = []
 
-    if workers == -1 or workers > 1:
-        pool = multiprocessing.Pool(workers)
-        results = []
-
-        for i, col in enumerate(X.values.T):
-            col_name = X.columns[i]
-            if verbose:
-                print(f"{i}: {col_name}")
-            # Fit spherical model and extract effective range parameter
-            args = (XYs, col, lags, bw, distance_metric, col_name)
-            results.append(pool.apply_async(calculate_range, (args,)))
+    # Convert coordinates once rather than for every column
+    XYs = geometry_to_2d(XYs)
 
-        for result in results:
-            ranges.append(result.get())
+    # Pairwise distances are shared by every column unless each column
+    # needs its own random subsample of points
+    if len(XYs) <= 30000:
+        precomputed_distances = condensed_distances(XYs, distance_metric)
+    else:
+        precomputed_distances = None
 
-        pool.close()
-        pool.join()
+    if workers == -1 or workers > 1:
+        # Place shared distances in shared memory so that workers attach to
+        # them instead of unpickling a copy for every column
+        shm = None
+        worker_fn, worker_XYs, worker_distances = calculate_range, XYs, None
+        if precomputed_distances is not None:
+            shm = shared_memory.SharedMemory(
+                create=True, size=max(precomputed_distances.nbytes, 1)
+            )
+            shared = np.ndarray(
+                precomputed_distances.shape,
+                dtype=precomputed_distances.dtype,
+                buffer=shm.buf,
+            )
+            shared[:] = precomputed_distances
+            del shared
+            worker_fn, worker_XYs = calculate_range_shared, None
+            worker_distances = (
+                shm.name,
+                precomputed_distances.shape,
+                precomputed_distances.dtype.str,
+            )
+
+        try:
+            tasks = []
+            for i, col in enumerate(X.values.T):
+                col_name = X.columns[i]
+                if verbose:
+                    print(f"{i}: {col_name}")
+                # Fit spherical model and extract effective range parameter
+                args = (
+                    worker_XYs,
+                    col,
+                    lags,
+                    bw,
+                    distance_metric,
+                    col_name,
+                    worker_distances,
+                )
+                tasks.append(delayed(worker_fn)(args))
+
+            # Reuse loky worker processes and batch short column tasks together
+            ranges = Parallel(n_jobs=workers, backend="loky", batch_size="auto")(tasks)
+        finally:
+            if shm is not None:
+                shm.close()
+                shm.unlink()
     else:
         for i, col in enumerate(X.values.T):
             col_name = X.columns[i]
             if verbose:
                 print(f"{i}: {col_name}")
             # Fit spherical model and extract effective range parameter
-            args = (XYs, col, lags, bw, distance_metric, col_name)
+            args = (
+                XYs,
+                col,
+                lags,
+                bw,
+                distance_metric,
+                col_name,
+                precomputed_distances,
+            )
             eff_range = calculate_range(args)
             ranges.append(eff_range)
 
@@ -265,6 +397,92 @@ def plot_autocorrelation_ranges(
     return f, ax, ranges
 
 
+if njit is not None:
+
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _aoa_stats_numba(train, fold_of, tile):
+        n, n_features = train.shape
+        row_min = np.empty(n, dtype=np.float64)
+        row_sum = np.zeros(n, dtype=np.float64)
+        row_count = np.zeros(n, dtype=np.int64)
+        n_tiles = (n + tile - 1) // tile
+        for t in prange(n_tiles):
+            i0 = t * tile
+            i1 = min(i0 + tile, n)
+            for i in range(i0, i1):
+                row_min[i] = np.finfo(np.float64).max
+            for j0 in range(0, n, tile):
+                j1 = min(j0 + tile, n)
+                for i in range(i0, i1):
+                    fold_i = fold_of[i]
+                    dist_min = row_min[i]
+                    dist_sum = 0.0
+                    count = 0
+                    for j in range(j0, j1):
+                        if fold_of[j] == fold_i:
+                            continue
+                        d2 = 0.0
+                        for k in range(n_features):
+                            diff = train[i, k] - train[j, k]
+                            d2 += diff * diff
+                        dist = np.sqrt(d2)
+                        dist_sum += dist
+                        count += 1
+                        if dist < dist_min:
+                            dist_min = dist
+                    row_min[i] = dist_min
+                    row_sum[i] += dist_sum
+                    row_count[i] += count
+        return row_min, row_sum, row_count
+
+
+def _aoa_stats_blocked(train, fold_of, tile):
+    # Distances are symmetric, so each block of rows is only compared with
+    # itself and later rows; the later rows pick up the same distances
+    # through column-wise reductions
+    n = len(train)
+    row_min = np.full(n, np.inf, dtype=np.float64)
+    row_sum = np.zeros(n, dtype=np.float64)
+    row_count = np.zeros(n, dtype=np.int64)
+    for i0 in range(0, n, tile):
+        i1 = min(i0 + tile, n)
+        block = i1 - i0
+        dist = euclidean_distances(train[i0:i1], train[i0:])
+        excluded = fold_of[i0:i1, None] == fold_of[None, i0:]
+        dist[excluded] = np.inf
+        row_min[i0:i1] = np.minimum(row_min[i0:i1], dist.min(axis=1))
+        if i1 < n:
+            row_min[i1:] = np.minimum(row_min[i1:], dist[:, block:].min(axis=0))
+        dist[excluded] = 0.0
+        row_sum[i0:i1] += dist.sum(axis=1)
+        row_sum[i1:] += dist[:, block:].sum(axis=0)
+        included = ~excluded
+        row_count[i0:i1] += included.sum(axis=1)
+        row_count[i1:] += included[:, block:].sum(axis=0)
+    return row_min, row_sum, row_count
+
+
+def _aoa_stats(train, fold_of):
+    """
+    Row-wise minimum and mean of distances between training instances,
+    skipping pairs that share a fold. Distances are computed tile by tile
+    so the N x N distance matrix is never stored. The numba kernel is only
+    used for training sets large enough to pay back its compilation.
+    """
+    if njit is not None and len(train) >= AOA_NUMBA_MIN_SAMPLES:
+        row_min, row_sum, row_count = _aoa_stats_numba(train, fold_of, 64)
+    else:
+        row_min, row_sum, row_count = _aoa_stats_blocked(train, fold_of, 1024)
+    if (row_count == 0).any():
+        raise ValueError(
+            "{} training instances have no training instances outside their "
+            "own fold. At least two folds need to be specified.".format(
+                np.count_nonzero(row_count == 0)
+            )
+        )
+    return row_min, row_sum / row_count
+
+
 def aoa(
     new_data,
     training_data,
@@ -311,13 +529,20 @@ def aoa(
     tree = BallTree(training_data, metric=distance_metric)
     mindist, _ = tree.query(new_data, k=1, return_distance=True)
 
-    # Build matrix of pairwise distances
-    paired_distances = pdist(training_data)
-    train_dist = squareform(paired_distances)
-    np.fill_diagonal(train_dist, np.nan)
+    # Standardised features need no more than single precision, which halves
+    # the memory traffic of the pairwise pass over the training data
+    training_data = np.ascontiguousarray(training_data, dtype=np.float32)
+
+    # Assign every training instance its own fold unless folds are given, so
+    # that only the distance of an instance to itself is excluded
+    fold_of = np.arange(len(training_data), dtype=np.int64)
 
     # Remove data points that are within the same fold
     if fold_indices:
+        # Offset the default IDs so instances outside fold_indices keep
+        # their own fold and cannot collide with a given fold ID
+        fold_of += len(fold_indices)
+
         # Get number of training instances in each fold
         instances_in_folds = [len(fold) for fold in fold_indices]
         instance_fold_id = np.repeat(
@@ -325,21 +550,17 @@ def aoa(
         )
 
         # Create mapping between training instance and fold ID
-        fold_indices = np.concatenate(fold_indices)
-        folds = np.vstack((fold_indices, instance_fold_id)).T
+        fold_of[np.concatenate(fold_indices)] = instance_fold_id
 
-        # Mask training points in same fold for DI measure calculation
-        for i, _ in enumerate(train_dist):
-            mask = folds[:, 0] == folds[:, 0][i]
-            train_dist[i, mask] = np.nan
+    # Distance to nearest training point outside the same fold, and the
+    # average distance to all training points outside the same fold
+    train_dist_min, train_dist_mean = _aoa_stats(training_data, fold_of)
 
     # Scale distance to nearest training point by average distance across training data
-    train_dist_mean = np.nanmean(train_dist, axis=1)
     train_dist_avgmean = np.mean(train_dist_mean)
     mindist /= train_dist_avgmean
 
     # Define threshold for AOA
-    train_dist_min = np.nanmin(train_dist, axis=1)
     # aoa_train_stats = np.quantile(
     #     train_dist_min / train_dist_avgmean,
     #     q=np.array([0.25, 0.5, 0.75, 0.9, 0.95, 0.99, 1]),